@@ -1,11 +1,15 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta
 import plotly.express as px
 import plotly.graph_objects as go
 import gspread
 from google.oauth2.service_account import Credentials
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import io
 
 # Page configuration
 st.set_page_config(page_title="Personal Expense Tracker", page_icon="💰", layout="wide")
@@ -29,6 +33,12 @@ def get_google_sheet():
         )
         
         client = gspread.authorize(credentials)
+        # Back off on rate limits/server errors on gspread's keep-alive session
+        client.http_client.session.mount('https://', HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=10,
+            max_retries=Retry(total=5, backoff_factor=0.5, status_forcelist=[429, 500, 503])
+        ))
         
         # Open the spreadsheet (you can use spreadsheet name or key)
         sheet_name = st.secrets.get("sheet_name", "Personal Expense Tracker")
@@ -40,28 +50,29 @@ def get_google_sheet():
             spreadsheet = client.create(sheet_name)
             spreadsheet.share('', perm_type='anyone', role='writer')
         
-        return spreadsheet
+        # Fetch all worksheets with a single metadata request
+        sheets = {ws.title: ws for ws in spreadsheet.worksheets()}
+        
+        return spreadsheet, sheets
     except Exception as e:
         st.error(f"Error connecting to Google Sheets: {str(e)}")
-        return None
+        return None, None
 
-def get_expenses_worksheet(spreadsheet):
+def get_expenses_worksheet(spreadsheet, sheets):
     """Get or create Expenses worksheet"""
-    try:
-        worksheet = spreadsheet.worksheet("Expenses")
-    except gspread.WorksheetNotFound:
+    worksheet = sheets.get("Expenses")
+    if worksheet is None:
         worksheet = spreadsheet.add_worksheet(title="Expenses", rows=1000, cols=10)
         worksheet.update('A1:D1', [['Date', 'Amount', 'Category', 'Description']])
+        sheets["Expenses"] = worksheet
     return worksheet
 
-def get_categories_worksheet(spreadsheet):
+def get_categories_worksheet(spreadsheet, sheets):
     """Get or create Categories worksheet"""
-    try:
-        worksheet = spreadsheet.worksheet("Categories")
-    except gspread.WorksheetNotFound:
+    worksheet = sheets.get("Categories")
+    if worksheet is None:
         worksheet = spreadsheet.add_worksheet(title="Categories", rows=100, cols=1)
-        worksheet.update('A1', [['Category']])
-        # Add default categories
+        # Write header and default categories in a single request
         default_categories = [
             ["Food & Dining"],
             ["Transportation"],
@@ -74,71 +85,108 @@ def get_categories_worksheet(spreadsheet):
             ["Groceries"],
             ["Other"]
         ]
-        worksheet.append_rows(default_categories)
+        worksheet.update(
+            range_name='A1:A11',
+            values=[['Category']] + default_categories,
+            value_input_option='USER_ENTERED'
+        )
+        sheets["Categories"] = worksheet
     return worksheet
 
-def load_categories(worksheet):
-    """Load categories from Google Sheets"""
-    try:
-        data = worksheet.get_all_records()
-        if data:
-            return [row['Category'] for row in data]
-        return []
-    except Exception as e:
-        st.error(f"Error loading categories: {str(e)}")
-        return []
+@st.cache_data(ttl=60, show_spinner=False)
+def load_categories(sheet_id, ws_title):
+    """Load categories from Google Sheets (cached per spreadsheet)
+
+    Errors propagate so that a failed fetch is not cached.
+    """
+    _, sheets = get_google_sheet()
+    worksheet = sheets[ws_title]
+    # Skip the header row
+    return worksheet.col_values(1)[1:]
 
 def add_category(worksheet, category):
     """Add a new category"""
     try:
         worksheet.append_row([category])
+        load_categories.clear()
         return True
     except Exception as e:
         st.error(f"Error adding category: {str(e)}")
         return False
 
-def delete_category(worksheet, category):
-    """Delete a category"""
+def delete_category(worksheet, category, row_num):
+    """Delete a category by its sheet row number"""
     try:
-        cell = worksheet.find(category)
-        if cell:
-            worksheet.delete_rows(cell.row)
-            return True
-        return False
+        worksheet.delete_rows(row_num)
+        load_categories.clear()
+        return True
     except Exception as e:
         st.error(f"Error deleting category: {str(e)}")
         return False
 
-def load_expenses(worksheet):
-    """Load expenses from Google Sheets"""
-    try:
-        data = worksheet.get_all_records()
-        if data:
-            df = pd.DataFrame(data)
-            df['Date'] = pd.to_datetime(df['Date'])
-            df['Amount'] = pd.to_numeric(df['Amount'])
-            # Add row numbers for editing/deleting
-            df['RowNum'] = range(2, len(df) + 2)  # +2 because row 1 is header and sheets are 1-indexed
-            return df
-        return pd.DataFrame(columns=['Date', 'Amount', 'Category', 'Description', 'RowNum'])
-    except Exception as e:
-        st.error(f"Error loading data: {str(e)}")
-        return pd.DataFrame(columns=['Date', 'Amount', 'Category', 'Description', 'RowNum'])
+@st.cache_data(ttl=60, show_spinner=False)
+def load_expenses(sheet_id, ws_title):
+    """Load expenses from Google Sheets (cached per spreadsheet)
+
+    Returns the expenses DataFrame, its (min, max) date extent and a content
+    token for keying downstream caches; extent and token are None when there
+    are no expenses. Errors propagate so that a failed fetch is not cached.
+    """
+    _, sheets = get_google_sheet()
+    worksheet = sheets[ws_title]
+    # Single values call; dates come back as strings, amounts as numbers
+    values = worksheet.get(
+        'A2:D',
+        value_render_option='UNFORMATTED_VALUE',
+        date_time_render_option='FORMATTED_STRING'
+    )
+    # An empty range comes back as [[]]
+    if any(values):
+        # Sheets trims trailing blank cells, so right-pad every row to 4 columns
+        values = gspread.utils.fill_gaps(values, cols=4)
+        df = pd.DataFrame(values, columns=['Date', 'Amount', 'Category', 'Description'])
+        df['Date'] = pd.to_datetime(df['Date'], format='%Y-%m-%d', cache=True)
+        df['Amount'] = pd.to_numeric(df['Amount']).astype(float)
+        # Categorical codes speed up groupby/isin on the small category set
+        df['Category'] = df['Category'].astype(str).astype('category')
+        # Arrow-backed strings keep descriptions in one contiguous buffer
+        df['Description'] = df['Description'].astype(str).astype('string[pyarrow]')
+        # Add row numbers for editing/deleting
+        df['RowNum'] = range(2, len(df) + 2)  # +2 because row 1 is header and sheets are 1-indexed
+        data_token = int(pd.util.hash_pandas_object(df, index=False).sum())
+        return df, (df['Date'].min(), df['Date'].max()), data_token
+    return pd.DataFrame(columns=['Date', 'Amount', 'Category', 'Description', 'RowNum']), None, None
 
 def add_expense(worksheet, date, amount, category, description):
     """Add a new expense to Google Sheets"""
     try:
-        row = [date.strftime('%Y-%m-%d'), float(amount), category, description]
-        worksheet.append_row(row)
+        row = [date.isoformat(), float(amount), category, description]
+        worksheet.append_row(row, value_input_option='RAW')
+        load_expenses.clear()
         return True
     except Exception as e:
         st.error(f"Error adding expense: {str(e)}")
         return False
 
+def add_expenses_bulk(worksheet, rows):
+    """Append many expenses to Google Sheets in a single request"""
+    try:
+        worksheet.append_rows(rows, value_input_option='RAW', insert_data_option='INSERT_ROWS')
+        load_expenses.clear()
+        return True
+    except Exception as e:
+        st.error(f"Error importing expenses: {str(e)}")
+        return False
+
 def update_expense(worksheet, row_num, date, amount, category, description):
     """Update an existing expense"""
     try:
-        worksheet.update(f'A{row_num}:D{row_num}', [[date.strftime('%Y-%m-%d'), float(amount), category, description]])
+        worksheet.update(
+            range_name=f'A{row_num}:D{row_num}',
+            values=[[date.isoformat(), float(amount), category, description]],
+            value_input_option='RAW'
+        )
+        load_expenses.clear()
         return True
     except Exception as e:
         st.error(f"Error updating expense: {str(e)}")
@@ -148,6 +196,7 @@ def delete_expense(worksheet, row_num):
     """Delete an expense"""
     try:
         worksheet.delete_rows(row_num)
+        load_expenses.clear()
         return True
     except Exception as e:
         st.error(f"Error deleting expense: {str(e)}")
@@ -156,13 +205,106 @@ def delete_expense(worksheet, row_num):
 def clear_all_expenses(worksheet):
     """Clear all expenses from Google Sheets"""
     try:
-        worksheet.clear()
-        worksheet.update('A1:D1', [['Date', 'Amount', 'Category', 'Description']])
+        # Clear data rows only; the header row is left untouched
+        worksheet.batch_clear(['A2:D'])
+        load_expenses.clear()
         return True
     except Exception as e:
         st.error(f"Error clearing data: {str(e)}")
         return False
 
+def filter_expenses(df, categories, lo, hi, min_amount):
+    """Filter expenses to [lo, hi), the given categories and a minimum amount"""
+    mask = (
+        (df['date'].values >= lo.to_datetime64()) &
+        (df['date'].values < hi.to_datetime64()) &
+        (df['amount'].values >= min_amount) &
+        df['category'].isin(categories).values
+    )
+    return df.iloc[mask]
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def category_stats(_df, data_token, categories, lo, hi, min_amount):
+    """Aggregate the filtered expenses once for all tabs (keyed on data token and filters)"""
+    filtered_df = filter_expenses(_df, list(categories), lo, hi, min_amount)
+    # One pass for both per-category totals and transaction counts
+    stats = filtered_df.groupby('category', observed=True)['amount'].agg(['sum', 'count']).sort_values('sum', ascending=False)
+    category_spending = stats['sum']
+    top_categories = category_spending.head(3)
+    freq = stats['count'].sort_values(ascending=False).head(3)
+    total = category_spending.sum()
+    daily_spending = filtered_df.groupby(filtered_df['date'].dt.normalize())['amount'].sum().reset_index()
+    daily_spending.columns = ['Date', 'Amount']
+    median = filtered_df['amount'].median()
+    daily_avg = total / max(len(daily_spending), 1)
+    return category_spending, daily_spending, freq, top_categories, total, median, daily_avg
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def transaction_labels(_df, data_token):
+    """Build 'date | $amount | category | description' selector labels once per data load"""
+    # datetime_as_string formats in C, unlike the per-element strftime behind .dt.strftime
+    dates = pd.Series(np.datetime_as_string(_df['date'].to_numpy(dtype='datetime64[D]'), unit='D'), index=_df.index)
+    return (
+        dates + ' | $' +
+        _df['amount'].map('{:.2f}'.format) + ' | ' +
+        _df['category'].astype(str) + ' | ' +
+        _df['description'].fillna('').astype(str)
+    ).tolist()
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def build_pie(values, names):
+    """Build the spending-by-category donut chart"""
+    fig = px.pie(values=values, names=names, title="Spending by Category", hole=0.4)
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    return fig
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def build_bar(values, names):
+    """Build the horizontal spending-by-category bar chart"""
+    fig = px.bar(
+        x=values,
+        y=names,
+        orientation='h',
+        title="Total Spending by Category",
+        labels={'x': 'Amount ($)', 'y': 'Category'}
+    )
+    fig.update_layout(showlegend=False)
+    return fig
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def build_line(dates, amounts):
+    """Build the daily spending trend chart"""
+    daily_spending = pd.DataFrame({'Date': dates, 'Amount': amounts})
+    fig = px.line(daily_spending, x='Date', y='Amount', title="Daily Spending Trend", markers=True)
+    fig.update_layout(xaxis_title="Date", yaxis_title="Amount ($)")
+    return fig
+
+@st.dialog("Delete Transaction")
+def confirm_delete_dialog(worksheet, row_num, summary):
+    """Confirm and delete a single expense"""
+    st.warning(f"⚠️ Delete this transaction?\n\n{summary}")
+    col1, col2 = st.columns(2)
+    if col1.button("🗑️ Delete", type="primary", use_container_width=True):
+        if delete_expense(worksheet, row_num):
+            st.rerun()
+        else:
+            st.error("❌ Failed to delete transaction.")
+    if col2.button("Cancel", use_container_width=True):
+        st.rerun()
+
+@st.dialog("Clear All Data")
+def confirm_clear_dialog(worksheet):
+    """Confirm and clear all expenses"""
+    st.warning("⚠️ This deletes all expenses from Google Sheets.")
+    col1, col2 = st.columns(2)
+    if col1.button("🗑️ Clear All", type="primary", use_container_width=True):
+        if clear_all_expenses(worksheet):
+            st.rerun()
+        else:
+            st.error("❌ Failed to clear expenses.")
+    if col2.button("Cancel", use_container_width=True):
+        st.rerun()
+
 # Title
 st.title("💰 Personal Expense Tracker")
 st.markdown("*Data stored in Google Sheets*")
@@ -212,18 +354,23 @@ with st.expander("📋 Setup Instructions"):
     """)
 
 # Try to connect to Google Sheets
-spreadsheet = get_google_sheet()
+spreadsheet, sheets = get_google_sheet()
 
 if spreadsheet is None:
     st.error("⚠️ Unable to connect to Google Sheets. Please check your credentials.")
     st.info("👆 Click 'Setup Instructions' above to configure Google Sheets API.")
     st.stop()
 
-expenses_worksheet = get_expenses_worksheet(spreadsheet)
-categories_worksheet = get_categories_worksheet(spreadsheet)
+expenses_worksheet = get_expenses_worksheet(spreadsheet, sheets)
+categories_worksheet = get_categories_worksheet(spreadsheet, sheets)
 
 # Load categories
-categories = load_categories(categories_worksheet)
+try:
+    categories = load_categories(spreadsheet.id, categories_worksheet.title)
+except Exception as e:
+    st.error(f"Error loading categories: {str(e)}")
+    categories = []
+categories_with_rows = list(enumerate(categories, start=2))  # row 1 is the header
 
 # Sidebar for adding expenses and managing categories
 with st.sidebar:
@@ -244,6 +391,29 @@ with st.sidebar:
             else:
                 st.error("❌ Failed to add expense.")
     
+    with st.expander("📤 Import from CSV"):
+        with st.form("import_csv_form"):
+            uploaded_file = st.file_uploader("CSV with date, amount, category, description columns", type="csv")
+            import_btn = st.form_submit_button("Import Expenses", use_container_width=True)
+            
+            if import_btn and uploaded_file is not None:
+                try:
+                    import_df = pd.read_csv(uploaded_file)
+                    import_df.columns = import_df.columns.str.strip().str.lower()
+                    rows = pd.DataFrame({
+                        'date': pd.to_datetime(import_df['date']).dt.strftime('%Y-%m-%d'),
+                        'amount': pd.to_numeric(import_df['amount']).astype(float),
+                        'category': import_df['category'].astype(str),
+                        'description': import_df['description'].fillna('').astype(str)
+                    }).values.tolist()
+                except Exception as e:
+                    st.error(f"❌ Could not read CSV: {str(e)}")
+                    rows = []
+                
+                if rows and add_expenses_bulk(expenses_worksheet, rows):
+                    st.success(f"✅ Imported {len(rows)} expenses!")
+                    st.rerun()
+    
     st.markdown("---")
     
     # Manage Categories
@@ -264,11 +434,15 @@ with st.sidebar:
     with st.expander("🗑️ Delete Category"):
         if categories:
             with st.form("delete_category_form"):
-                cat_to_delete = st.selectbox("Select Category to Delete", categories)
+                cat_row, cat_to_delete = st.selectbox(
+                    "Select Category to Delete",
+                    categories_with_rows,
+                    format_func=lambda item: item[1]
+                )
                 del_cat_btn = st.form_submit_button("Delete Category", use_container_width=True, type="secondary")
                 
                 if del_cat_btn and cat_to_delete:
-                    if delete_category(categories_worksheet, cat_to_delete):
+                    if delete_category(categories_worksheet, cat_to_delete, cat_row):
                         st.success(f"✅ Deleted '{cat_to_delete}'!")
                         st.rerun()
         else:
@@ -282,7 +456,11 @@ with st.sidebar:
             st.info("No categories found")
 
 # Load expenses
-df = load_expenses(expenses_worksheet)
+try:
+    df, date_extent, data_token = load_expenses(spreadsheet.id, expenses_worksheet.title)
+except Exception as e:
+    st.error(f"Error loading data: {str(e)}")
+    df, date_extent, data_token = pd.DataFrame(columns=['Date', 'Amount', 'Category', 'Description', 'RowNum']), None, None
 
 # Main content
 if len(df) == 0:
@@ -291,6 +469,9 @@ else:
     # Rename columns for consistency
     df = df.rename(columns={'Date': 'date', 'Amount': 'amount', 'Category': 'category', 'Description': 'description', 'RowNum': 'row_num'})
     
+    # Sort once, newest first; filtering keeps this order for every tab
+    sorted_df = df.sort_values('date', ascending=False)
+    
     # Summary metrics
     col1, col2, col3, col4 = st.columns(4)
     
@@ -317,7 +498,7 @@ else:
     with col1:
         date_range = st.date_input(
             "Date Range",
-            value=(df['date'].min().date(), df['date'].max().date()),
+            value=(date_extent[0].date(), date_extent[1].date()),
             key="date_range"
         )
     
@@ -332,17 +513,18 @@ else:
     with col3:
         min_amount = st.number_input("Min Amount ($)", min_value=0.0, value=0.0)
     
-    # Apply filters
-    filtered_df = df[
-        (df['date'].dt.date >= date_range[0]) &
-        (df['date'].dt.date <= date_range[1]) &
-        (df['category'].isin(selected_categories)) &
-        (df['amount'] >= min_amount)
-    ].copy()
+    # Apply filters on the raw datetime64 values (end date is inclusive)
+    lo = pd.Timestamp(date_range[0])
+    hi = pd.Timestamp(date_range[1]) + pd.Timedelta(days=1)
+    filtered_df = filter_expenses(sorted_df, selected_categories, lo, hi, min_amount)
     
     if len(filtered_df) == 0:
         st.warning("No expenses match your filters.")
     else:
+        category_spending, daily_spending, freq, top_categories, total_spending, median, daily_avg = category_stats(
+            sorted_df, data_token, tuple(selected_categories), lo, hi, min_amount
+        )
+        
         # Visualizations
         tab1, tab2, tab3, tab4 = st.tabs(["📈 Charts", "📋 Data Table", "✏️ Edit/Delete", "💡 Insights"])
         
@@ -351,54 +533,32 @@ else:
             
             with col1:
                 # Spending by category
-                category_spending = filtered_df.groupby('category')['amount'].sum().sort_values(ascending=False)
-                fig_pie = px.pie(
-                    values=category_spending.values,
-                    names=category_spending.index,
-                    title="Spending by Category",
-                    hole=0.4
-                )
-                fig_pie.update_traces(textposition='inside', textinfo='percent+label')
+                fig_pie = build_pie(tuple(category_spending.values), tuple(category_spending.index))
                 st.plotly_chart(fig_pie, use_container_width=True)
             
             with col2:
                 # Category bar chart
-                fig_bar = px.bar(
-                    category_spending,
-                    x=category_spending.values,
-                    y=category_spending.index,
-                    orientation='h',
-                    title="Total Spending by Category",
-                    labels={'x': 'Amount ($)', 'y': 'Category'}
-                )
-                fig_bar.update_layout(showlegend=False)
+                fig_bar = build_bar(tuple(category_spending.values), tuple(category_spending.index))
                 st.plotly_chart(fig_bar, use_container_width=True)
             
             # Daily spending trend
-            daily_spending = filtered_df.groupby(filtered_df['date'].dt.date)['amount'].sum().reset_index()
-            daily_spending.columns = ['Date', 'Amount']
-            
-            fig_line = px.line(
-                daily_spending,
-                x='Date',
-                y='Amount',
-                title="Daily Spending Trend",
-                markers=True
-            )
-            fig_line.update_layout(xaxis_title="Date", yaxis_title="Amount ($)")
+            fig_line = build_line(tuple(daily_spending['Date']), tuple(daily_spending['Amount']))
             st.plotly_chart(fig_line, use_container_width=True)
         
         with tab2:
             # Data table
             st.subheader(f"All Transactions ({len(filtered_df)} records)")
             
-            # Sort and display
-            display_df = filtered_df.sort_values('date', ascending=False).copy()
-            display_df['date'] = display_df['date'].dt.strftime('%Y-%m-%d')
-            display_df['amount'] = display_df['amount'].apply(lambda x: f"${x:,.2f}")
+            # Formatted columns only (filtered_df is already newest-first)
+            display_df = pd.DataFrame({
+                'date': filtered_df['date'].dt.strftime('%Y-%m-%d'),
+                'amount': filtered_df['amount'].map('${:,.2f}'.format),
+                'category': filtered_df['category'],
+                'description': filtered_df['description']
+            })
             
             st.dataframe(
-                display_df[['date', 'amount', 'category', 'description']],
+                display_df,
                 use_container_width=True,
                 hide_index=True,
                 column_config={
@@ -409,42 +569,40 @@ else:
                 }
             )
             
-            # Export option
-            csv = filtered_df[['date', 'amount', 'category', 'description']].to_csv(index=False)
-            st.download_button(
-                label="📥 Download as CSV",
-                data=csv,
-                file_name=f"expenses_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv"
-            )
+            # Export option (only serialized when requested)
+            if st.button("📄 Prepare CSV"):
+                buf = io.StringIO()
+                filtered_df[['date', 'amount', 'category', 'description']].to_csv(buf, index=False, lineterminator='\n')
+                st.download_button(
+                    label="📥 Download as CSV",
+                    data=buf.getvalue().encode('utf-8'),
+                    file_name=f"expenses_{datetime.now().strftime('%Y%m%d')}.csv",
+                    mime="text/csv"
+                )
             
             # Refresh button
             if st.button("🔄 Refresh Data from Google Sheets"):
-                st.cache_resource.clear()
+                load_expenses.clear()
+                load_categories.clear()
                 st.rerun()
         
         with tab3:
             # Edit/Delete Transactions
             st.subheader("✏️ Edit or Delete Transactions")
             
-            # Sort by date for better selection
-            sorted_df = df.sort_values('date', ascending=False)
-            
-            # Create display options
-            options = []
-            for idx, row in sorted_df.iterrows():
-                display_text = f"{row['date'].strftime('%Y-%m-%d')} | ${row['amount']:.2f} | {row['category']} | {row['description']}"
-                options.append((display_text, idx))
+            # Display labels (cached per data load) alongside their index labels
+            labels = transaction_labels(sorted_df, data_token)
+            idx_array = sorted_df.index.to_numpy()
             
-            selected_display = st.selectbox(
+            selected_pos = st.selectbox(
                 "Select Transaction",
-                options=[opt[0] for opt in options],
+                options=range(len(labels)),
+                format_func=lambda i: labels[i],
                 key="transaction_selector"
             )
             
-            if selected_display:
-                # Find the selected transaction
-                selected_idx = next(opt[1] for opt in options if opt[0] == selected_display)
+            if selected_pos is not None:
+                selected_idx = int(idx_array[selected_pos])
                 selected_row = sorted_df.loc[selected_idx]
                 
                 col1, col2 = st.columns(2)
@@ -471,16 +629,7 @@ else:
                     st.info(f"**Date:** {selected_row['date'].strftime('%Y-%m-%d')}\n\n**Amount:** ${selected_row['amount']:.2f}\n\n**Category:** {selected_row['category']}\n\n**Description:** {selected_row['description']}")
                     
                     if st.button("🗑️ Delete This Transaction", type="secondary", use_container_width=True):
-                        if st.session_state.get('confirm_delete') == selected_idx:
-                            if delete_expense(expenses_worksheet, selected_row['row_num']):
-                                st.success("✅ Transaction deleted!")
-                                st.session_state.confirm_delete = None
-                                st.rerun()
-                            else:
-                                st.error("❌ Failed to delete transaction.")
-                        else:
-                            st.session_state.confirm_delete = selected_idx
-                            st.warning("⚠️ Click 'Delete This Transaction' again to confirm.")
+                        confirm_delete_dialog(expenses_worksheet, int(selected_row['row_num']), labels[selected_pos])
         
         with tab4:
             # Insights
@@ -490,42 +639,26 @@ else:
             
             with col1:
                 st.markdown("### Top Categories")
-                top_categories = filtered_df.groupby('category')['amount'].sum().sort_values(ascending=False).head(3)
                 for i, (cat, amt) in enumerate(top_categories.items(), 1):
-                    percentage = (amt / filtered_df['amount'].sum()) * 100
+                    percentage = (amt / total_spending) * 100
                     st.write(f"{i}. **{cat}**: ${amt:,.2f} ({percentage:.1f}%)")
                 
                 st.markdown("### Spending Frequency")
-                freq = filtered_df['category'].value_counts().head(3)
                 for i, (cat, count) in enumerate(freq.items(), 1):
                     st.write(f"{i}. **{cat}**: {count} transactions")
             
             with col2:
                 st.markdown("### Recent Expenses")
-                recent = filtered_df.sort_values('date', ascending=False).head(5)
+                recent = filtered_df.head(5)
                 for _, row in recent.iterrows():
                     st.write(f"**${row['amount']:,.2f}** - {row['category']}")
                     st.caption(f"{row['description']} ({row['date'].strftime('%Y-%m-%d')})")
                 
                 st.markdown("### Statistics")
-                st.write(f"**Daily Average**: ${filtered_df['amount'].sum() / max(len(filtered_df['date'].unique()), 1):,.2f}")
-                st.write(f"**Median Transaction**: ${filtered_df['amount'].median():,.2f}")
+                st.write(f"**Daily Average**: ${daily_avg:,.2f}")
+                st.write(f"**Median Transaction**: ${median:,.2f}")
     
     # Clear data option
     st.markdown("---")
     if st.button("🗑️ Clear All Data", type="secondary"):
-        if st.session_state.get('confirm_clear', False):
-            if clear_all_expenses(expenses_worksheet):
-                st.success("✅ All expenses cleared!")
-                st.session_state.confirm_clear = False
-                st.rerun()
-            else:
-                st.error("❌ Failed to clear expenses.")
-        else:
-            st.session_state.confirm_clear = True
-            st.warning("⚠️ Click again to confirm deletion of all expenses from Google Sheets.")
-    
-    if st.session_state.get('confirm_clear', False):
-        if st.button("Cancel"):
-            st.session_state.confirm_clear = False
-            st.rerun()
+        confirm_clear_dialog(expenses_worksheet)